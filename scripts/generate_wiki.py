@@ -1,52 +1,70 @@
-import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+def write_doc(doc):
+    path, content = doc
+    Path(path).write_text(content, encoding="utf-8")
+
 def generate_wiki():
     base_dir = Path(".")
     docs_dir = base_dir / "docs"
     docs_dir.mkdir(exist_ok=True)
 
     # Core Wiki Index
-    wiki_index = "# 🌌 CODE Wiki - Antigravity\n\n"
-    wiki_index += "Welcome to the Antigravity project documentation. This wiki is automatically generated.\n\n"
-    wiki_index += "## 🏗️ Architecture Overviews\n\n"
+    wiki_lines: list[str] = [
+        "# 🌌 CODE Wiki - Antigravity",
+        "",
+        "Welcome to the Antigravity project documentation. This wiki is automatically generated.",
+        "",
+        "## 🏗️ Architecture Overviews",
+        "",
+    ]
+    docs_to_write: list[tuple[Path, str]] = []
 
     # Scan apps and libs
     for category in ["apps", "libs"]:
-        wiki_index += f"### {category.capitalize()}\n"
+        wiki_lines.append(f"### {category.capitalize()}")
         cat_path = base_dir / category
         if cat_path.exists():
-            for item in cat_path.iterdir():
+            for item in sorted(cat_path.iterdir()):
                 if item.is_dir():
                     name = item.name
                     # Create a specific doc for each crate
-                    crate_doc_path = docs_dir / f"{name}.md"
-                    crate_doc_content = f"# 📦 {name}\n\n"
-                    crate_doc_content += f"**Category**: {category}\n\n"
-                    crate_doc_content += "## 📝 Description\n"
-                    crate_doc_content += f"Detailed documentation for the `{name}` crate.\n\n"
-                    
+                    crate_doc_lines = [
+                        f"# 📦 {name}",
+                        "",
+                        f"**Category**: {category}",
+                        "",
+                        "## 📝 Description",
+                        f"Detailed documentation for the `{name}` crate.",
+                        "",
+                    ]
+
                     # Try to find src files
                     src_path = item / "src"
                     if src_path.exists():
-                        crate_doc_content += "### 📂 Source Files\n"
-                        for src_file in src_path.glob("**/*.rs"):
+                        crate_doc_lines.append("### 📂 Source Files")
+                        for src_file in sorted(src_path.rglob("*.rs")):
                             rel_path = src_file.relative_to(item)
-                            crate_doc_content += f"- `{rel_path}`\n"
-                    
-                    with open(crate_doc_path, "w", encoding="utf-8") as f:
-                        f.write(crate_doc_content)
-                    
-                    wiki_index += f"- [{name}](./{name}.md)\n"
-        wiki_index += "\n"
-
-    wiki_index += "## 🛡️ Iron Principles\n\n"
-    wiki_index += "- **Result Type Mandatory**: `unwrap()` and `expect()` are forbidden.\n"
-    wiki_index += "- **Async/Await**: Using `tokio` for non-blocking I/O.\n"
-    wiki_index += "- **Workspace Structure**: Strict dependency directions.\n"
-
-    with open(docs_dir / "CODE_WIKI.md", "w", encoding="utf-8") as f:
-        f.write(wiki_index)
+                            crate_doc_lines.append(f"- `{rel_path}`")
+
+                    docs_to_write.append((docs_dir / f"{name}.md", "\n".join(crate_doc_lines) + "\n"))
+
+                    wiki_lines.append(f"- [{name}](./{name}.md)")
+        wiki_lines.append("")
+
+    wiki_lines += [
+        "## 🛡️ Iron Principles",
+        "",
+        "- **Result Type Mandatory**: `unwrap()` and `expect()` are forbidden.",
+        "- **Async/Await**: Using `tokio` for non-blocking I/O.",
+        "- **Workspace Structure**: Strict dependency directions.",
+    ]
+    docs_to_write.append((docs_dir / "CODE_WIKI.md", "\n".join(wiki_lines) + "\n"))
+
+    # Write all docs in parallel (I/O bound)
+    with ThreadPoolExecutor(max_workers=8) as ex:
+        list(ex.map(write_doc, docs_to_write))
 
     print("Wiki generated successfully in docs/")
 
@@ -8,23 +8,51 @@ POST /v1/audio/speech  →  44.1kHz WAV バイナリを返却
 - PYTORCH_ENABLE_MPS_FALLBACK=1 によるMPS非互換op自動CPU fallback
 
 パフォーマンス:
-- asyncio.to_thread でPyTorch推論をスレッドプールへオフロード
+- リファレンス音声のプロンプト (x-vector / ref_code) を LRU キャッシュし、リクエスト毎の再エンコードを回避
+- 44.1kHz へのリサンプル用 FIR カーネル (julius 方式) を起動時に1回だけ構築し、conv1d 1回で適用
+- デコーダ出力をデバイス上 (CUDA/MPS) に保持したままリサンプルし、44.1kHz PCM のみをホストへ転送
+- int16 量子化をデバイス上で行い、WAV ヘッダ (44 bytes) を struct で直接組み立てる (soundfile を経由しない)
+- 推論は torch.inference_mode() 下で実行 (CUDA / bf16 対応 CPU では bf16 autocast も併用)
+- CUDA では TTS_QUANT=int8 / nf4 で bitsandbytes 量子化ロード (重み帯域を 1/2〜1/4 に)
+- CUDA では自己回帰デコーダを torch.compile (code predictor は CUDA Graphs) してステップ毎の起動コストを削減
+- CUDA では専用ストリーム1本で全推論を実行し、キャッシングアロケータのプールを1ストリームに固定
+- ボイス名 → WAV パスの対応表を起動時 (以降は定期) にスキャンし、リクエスト毎のファイルシステムアクセスを排除
+- CPU 推論時は numpy のまま scipy.signal.resample_poly でリサンプルし、torch との往復変換を省略
+- 動的バッチング: 同一パラメータのリクエストを asyncio.Queue に集約し、1回の generate_voice_clone で推論
+- PyTorch 推論 (ロード・ウォームアップ含む) は専用の単一ワーカースレッドで直列実行 (1スレッド・1ストリーム)
+- WAV はヘッダ + PCM チャンクの StreamingResponse で返し、全体を1つの bytes に連結しない
+- uvloop + httptools を明示指定し、イベントループと HTTP パースを C 実装に固定
 - モデルは起動時に1回だけロード (グローバルシングルトン)
+- ロード直後にダミー生成でウォームアップ (カーネル初期化・アロケータ・コンパイルを初回リクエスト前に済ませる)
 """
 
 import os
-import io
-import re
+import string
+import struct
 import asyncio
 import logging
+import functools
+import math
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import NamedTuple
+
+# 可変長発話による断片化を防ぐため、torch の import 前にアロケータ設定を入れる (明示指定があればそちらを優先)
+os.environ.setdefault("PYTORCH_CUDA_ALLOC_CONF", "expandable_segments:True,max_split_size_mb:512")
 
 import torch
 import torchaudio
-import soundfile as sf
 import numpy as np
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import Response
-from pydantic import BaseModel
+import torch.nn.functional as F
+from torch.nn.utils.rnn import pad_sequence
+from scipy.signal import resample_poly
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import BaseModel, ConfigDict
+from starlette.exceptions import HTTPException as StarletteHTTPException
 from qwen_tts import Qwen3TTSModel
 
 # --- Configuration ---
@@ -33,24 +61,157 @@ VOICES_DIR = os.path.abspath(os.environ.get("VOICES_DIR", "../../resources/voice
 HOST = os.environ.get("TTS_HOST", "0.0.0.0")
 PORT = int(os.environ.get("TTS_PORT", "5001"))
 OUTPUT_SAMPLE_RATE = 44100
+DEFAULT_VOICE = "aiome_narrator"
+# VOICES_DIR の再スキャン間隔 (秒): 再起動なしで新しいボイスを反映する
+VOICE_MAP_REFRESH_SEC = float(os.environ.get("TTS_VOICE_REFRESH_SEC", "60"))
+# 動的バッチング: 1バッチの最大件数と、後続リクエストを待つ猶予 (ミリ秒)
+MAX_BATCH_SIZE = int(os.environ.get("TTS_MAX_BATCH_SIZE", "8"))
+BATCH_TIMEOUT_SEC = float(os.environ.get("TTS_BATCH_TIMEOUT_MS", "5")) / 1000.0
+# CUDA 時に talker / code predictor を torch.compile する (0 で無効)
+COMPILE_ENABLED = os.environ.get("TTS_COMPILE", "1") == "1"
+# CUDA 時の重み量子化: bf16 (量子化なし) / int8 / nf4  ※ int8 / nf4 は bitsandbytes が必要
+QUANT = os.environ.get("TTS_QUANT", "bf16")
+# WAV ストリーミング時の1チャンクのバイト数
+STREAM_CHUNK_BYTES = 64 * 1024
 
 # --- Logging ---
-logging.basicConfig(level=logging.INFO, format="%(asctime)s | %(levelname)s | %(message)s")
+_log_handler = logging.StreamHandler()
+_log_handler.setFormatter(logging.Formatter("%(asctime)s | %(levelname)s | %(message)s"))
+logging.basicConfig(level=logging.INFO, handlers=[_log_handler])
 logger = logging.getLogger("qwen3-tts-server")
 
 # --- Safety: voice name validation ---
-VOICE_NAME_RE = re.compile(r"^[a-zA-Z0-9_-]+$")
+# 英数字 + ハイフン + アンダースコアのみ・最大 64 文字 (正規表現を使わず集合演算で判定)
+_VOICE_NAME_CHARS = frozenset(string.ascii_letters + string.digits + "_-")
+_VOICE_NAME_MAX_LEN = 64
+
+
+def is_safe_voice_name(voice_name: str) -> bool:
+    """ボイス名が安全な文字種・長さに収まっているか"""
+    return 0 < len(voice_name) <= _VOICE_NAME_MAX_LEN and _VOICE_NAME_CHARS.issuperset(voice_name)
+
 
 # --- App ---
-app = FastAPI(title="Qwen3-TTS Server", version="1.0.0")
+app = FastAPI(title="Qwen3-TTS Server", version="1.0.0", default_response_class=ORJSONResponse)
 
 # --- Global model singleton ---
 model = None
 
+# --- 推論コンテキスト (load_model でデバイスに応じて差し替え) ---
+_INFER_CTX = torch.inference_mode
+
+# --- 推論専用 CUDA ストリーム (CUDA 時のみ load_model で生成) ---
+_INFER_STREAM: torch.cuda.Stream | None = None
+
+# --- CPU 経路の int16 量子化用スクラッチバッファ (ワーカースレッド専用, 必要に応じて拡張) ---
+_QUANT_SCRATCH = np.empty(0, dtype=np.float32)
+
+# --- Precomputed resample kernel (load_model で構築) ---
+_RESAMPLE_SR: int | None = None
+_RESAMPLE_KERNEL: torch.Tensor | None = None
+_RESAMPLE_OLD = 1
+_RESAMPLE_NEW = 1
+_RESAMPLE_WIDTH = 0
+
+
+def build_resample_kernel(old_sr: int, new_sr: int, zeros: int = 24, rolloff: float = 0.945):
+    """
+    julius.resample_frac と同じ窓付き sinc ポリフェーズカーネルを構築する。
+    Returns: (kernel [new, 1, 2*width+old], old, new, width)  ※ old/new は gcd で約分済み
+    """
+    g = math.gcd(old_sr, new_sr)
+    old, new = old_sr // g, new_sr // g
+    sr = min(new, old) * rolloff
+    width = math.ceil(zeros * old / sr)
+    idx = torch.arange(-width, width + old, dtype=torch.float64)
+    phases = torch.arange(new, dtype=torch.float64).view(-1, 1)
+    t = ((-phases / new + idx / old) * sr).clamp_(-zeros, zeros) * math.pi
+    window = torch.cos(t / zeros / 2) ** 2
+    kernel = torch.where(t == 0, torch.ones_like(t), torch.sin(t) / t) * window
+    kernel /= kernel.sum(dim=-1, keepdim=True)
+    return kernel.view(new, 1, -1).float(), old, new, width
+
+
+def init_resampler(sr: int, device: torch.device):
+    """モデル出力サンプルレートが確定した時点でリサンプルカーネルを計算デバイス上にキャッシュする"""
+    global _RESAMPLE_SR, _RESAMPLE_KERNEL, _RESAMPLE_OLD, _RESAMPLE_NEW, _RESAMPLE_WIDTH
+    if sr == OUTPUT_SAMPLE_RATE:
+        return
+    _RESAMPLE_KERNEL, _RESAMPLE_OLD, _RESAMPLE_NEW, _RESAMPLE_WIDTH = build_resample_kernel(sr, OUTPUT_SAMPLE_RATE)
+    _RESAMPLE_KERNEL = _RESAMPLE_KERNEL.to(device)
+    _RESAMPLE_SR = sr
+    logger.info(f"Resample kernel ready: {sr}Hz → {OUTPUT_SAMPLE_RATE}Hz (taps={_RESAMPLE_KERNEL.shape[-1]})")
+
+
+def resample(wav: torch.Tensor, sr: int) -> torch.Tensor:
+    """[1, T] 波形を OUTPUT_SAMPLE_RATE にリサンプルする。キャッシュ外の sr は torchaudio にフォールバック"""
+    if sr != _RESAMPLE_SR or _RESAMPLE_KERNEL is None:
+        return torchaudio.functional.resample(wav, sr, OUTPUT_SAMPLE_RATE)
+
+    kernel = _RESAMPLE_KERNEL if _RESAMPLE_KERNEL.device == wav.device else _RESAMPLE_KERNEL.to(wav.device)
+    length = wav.shape[-1]
+    x = F.pad(wav.unsqueeze(1), (_RESAMPLE_WIDTH, _RESAMPLE_WIDTH + _RESAMPLE_OLD), mode="replicate")
+    y = F.conv1d(x, kernel, stride=_RESAMPLE_OLD)
+    y = y.transpose(1, 2).reshape(wav.shape[0], -1)
+    return y[..., :int(_RESAMPLE_NEW * length / _RESAMPLE_OLD)]
+
+
+def cpu_supports_bf16() -> bool:
+    """CPU が AVX-512 BF16 / AMX BF16 命令を持つか (/proc/cpuinfo の flags で判定)"""
+    try:
+        with open("/proc/cpuinfo", encoding="utf-8") as f:
+            flags = f.read()
+    except OSError:
+        return False
+    return "avx512_bf16" in flags or "amx_bf16" in flags
+
+
+def make_infer_ctx(autocast_device: str | None):
+    """inference_mode (+ 任意で bf16 autocast) をまとめたコンテキストファクトリを返す"""
+    @contextlib.contextmanager
+    def infer_ctx():
+        with contextlib.ExitStack() as stack:
+            stack.enter_context(torch.inference_mode())
+            if autocast_device is not None:
+                stack.enter_context(torch.autocast(device_type=autocast_device, dtype=torch.bfloat16))
+            yield
+
+    return infer_ctx
+
+
+def infer_stream():
+    """CUDA では推論専用ストリームに切り替えるコンテキスト (それ以外は何もしない)"""
+    if _INFER_STREAM is None:
+        return contextlib.nullcontext()
+    return torch.cuda.stream(_INFER_STREAM)
+
+
+def build_quant_config():
+    """
+    TTS_QUANT に応じた BitsAndBytesConfig を返す (bf16 なら None)。
+    精度に敏感な話者エンコーダ・音声コーデック (encoder / decoder)・出力ヘッド (talker の codec_head / code predictor の lm_head) は量子化対象から外す。
+    """
+    if QUANT == "bf16":
+        return None
+
+    from transformers import BitsAndBytesConfig
+
+    skip_modules = ["speaker_encoder", "encoder", "decoder", "codec_head", "lm_head"]
+    if QUANT == "int8":
+        return BitsAndBytesConfig(load_in_8bit=True, llm_int8_threshold=6.0, llm_int8_skip_modules=skip_modules)
+    if QUANT == "nf4":
+        return BitsAndBytesConfig(
+            load_in_4bit=True,
+            bnb_4bit_quant_type="nf4",
+            bnb_4bit_compute_dtype=torch.bfloat16,
+            llm_int8_skip_modules=skip_modules,
+        )
+    raise ValueError(f"Unknown TTS_QUANT: '{QUANT}' (expected bf16 / int8 / nf4)")
+
 
 def load_model():
     """モデルを1回だけロードする (コールドスタート)"""
-    global model
+    global model, _INFER_CTX, _INFER_STREAM
     if model is not None:
         return
 
@@ -62,30 +223,126 @@ def load_model():
         dtype = torch.float32  # MPS は bfloat16 未サポートの場合がある
         attn_impl = "eager"    # FlashAttention は MPS 非互換
         logger.info("Using MPS device with eager attention and float32")
+        autocast_device = None  # MPS の autocast は不安定なため inference_mode のみ
+        quant_config = None
     elif torch.cuda.is_available():
         device = "cuda:0"
         dtype = torch.bfloat16
         attn_impl = "flash_attention_2"
         logger.info("Using CUDA device with flash_attention_2 and bfloat16")
+        autocast_device = "cuda"
+        quant_config = build_quant_config()
     else:
         device = "cpu"
         dtype = torch.float32
         attn_impl = "eager"
         logger.info("Using CPU device with eager attention and float32")
+        autocast_device = "cpu" if cpu_supports_bf16() else None
+        quant_config = None
+
+    if quant_config is None and QUANT != "bf16":
+        logger.warning(f"TTS_QUANT={QUANT} is only supported on CUDA; loading without quantization")
+
+    quant_kwargs = {"quantization_config": quant_config} if quant_config is not None else {}
 
     model = Qwen3TTSModel.from_pretrained(
         MODEL_ID,
         device_map=device,
         dtype=dtype,
         attn_implementation=attn_impl,
+        **quant_kwargs,
     )
     logger.info("Model loaded successfully")
 
+    if quant_config is not None:
+        spk_dtype = next(model.model.speaker_encoder.parameters()).dtype
+        logger.info(f"Quantized talker weights: {QUANT} (speaker encoder dtype={spk_dtype})")
+        if spk_dtype != dtype:
+            logger.warning(f"Speaker encoder dtype {spk_dtype} differs from expected {dtype}")
+
+    compiled = False
+    if device.startswith("cuda"):
+        _INFER_STREAM = torch.cuda.Stream(device=device)
+        # ロード時 (デフォルトストリーム) に書き込まれた重みを推論ストリームから安全に読めるようにする
+        _INFER_STREAM.wait_stream(torch.cuda.current_stream(device))
+        if COMPILE_ENABLED:
+            compile_decoders(model)
+            compiled = True
+
+    _INFER_CTX = make_infer_ctx(autocast_device)
+    logger.info(f"Inference context: inference_mode, autocast={autocast_device or 'off'}")
+
+    patch_device_decode(model)
+    init_resampler(model.model.speech_tokenizer.get_output_sample_rate(), model.device)
+    # code predictor の CUDA Graph はバッチサイズ毎にキャプチャされるため、コンパイル時は全サイズを温める
+    warmup(range(1, MAX_BATCH_SIZE + 1) if compiled else [1])
+
+
+def warmup(batch_sizes):
+    """
+    デフォルトボイスでダミー生成し、初回リクエストが払う一度きりのコスト
+    (CUDA カーネル初期化, cuBLAS ハンドル, キャッシングアロケータの拡張, torch.compile / CUDA Graph キャプチャ) を前倒しする。
+    batch_sizes の各サイズで1回ずつ生成する。デフォルトボイスのプロンプトキャッシュもここで埋まる。
+    失敗してもサーバー起動は継続する。
+    """
+    try:
+        params = resolve_params(DEFAULT_VOICE, None)
+        for n in batch_sizes:
+            synthesize_batch(["ウォームアップ"] * n, params)
+        logger.info(f"Warmup generation completed (batch sizes: {list(batch_sizes)})")
+    except Exception as e:
+        logger.warning(f"Warmup generation skipped: {e}")
+
+
+def compile_decoders(tts_model):
+    """
+    自己回帰ループの transformer 本体を torch.compile する。
+    - code predictor: 1 talker ステップ毎に固定長 (num_code_groups - 1) を生成するため入力形状の種類が有限
+      → mode="reduce-overhead" (CUDA Graphs) で形状毎にグラフをキャプチャして再生する
+    - talker: KV キャッシュ長がステップ毎に伸びるため dynamic=True でカーネル融合のみ行い、再コンパイルを抑える
+    """
+    talker = tts_model.model.talker
+    num_shapes = talker.config.num_code_groups * MAX_BATCH_SIZE
+    torch._dynamo.config.cache_size_limit = max(torch._dynamo.config.cache_size_limit, num_shapes)
+
+    talker.code_predictor.model = torch.compile(
+        talker.code_predictor.model, mode="reduce-overhead", fullgraph=False, dynamic=False
+    )
+    talker.model = torch.compile(talker.model, fullgraph=False, dynamic=True)
+    logger.info(f"torch.compile enabled for talker / code predictor (cache_size_limit={torch._dynamo.config.cache_size_limit})")
+
+
+def patch_device_decode(tts_model):
+    """
+    speech_tokenizer.decode は波形を .cpu().numpy() して返すため、
+    12Hz トークナイザの場合はデバイス上の float32 テンソルを返す版に差し替える。
+    generate_voice_clone 側の ref_code 分のカット (wav[cut:]) はテンソルのまま動作する。
+    """
+    tokenizer = tts_model.model.speech_tokenizer
+    if tokenizer.get_model_type() != "qwen3_tts_tokenizer_12hz":
+        logger.info("Device-side decode not available for this tokenizer; using numpy output")
+        return
+
+    output_sr = tokenizer.get_output_sample_rate()
+
+    def decode_on_device(encoded):
+        codes = [torch.as_tensor(e["audio_codes"], dtype=torch.long) for e in encoded]
+        codes_padded = pad_sequence(codes, batch_first=True, padding_value=-1).to(tokenizer.device)
+        # generate_voice_clone 内 (_INFER_CTX の autocast 下) から呼ばれるが、コーデックは精度に敏感なため full precision で実行
+        with torch.inference_mode(), torch.autocast(device_type=codes_padded.device.type, enabled=False):
+            dec = tokenizer.model.decode(codes_padded, return_dict=True)
+        return [w.to(torch.float32) for w in dec.audio_values], output_sr
+
+    tokenizer.decode = decode_on_device
+
 
 class SpeechRequest(BaseModel):
     """OpenAI API 互換リクエスト"""
+    # OpenAI クライアントが送る model 等の未使用フィールドは無視する (forbid にすると互換性が壊れる)
+    model_config = ConfigDict(extra="ignore", str_strip_whitespace=True)
+
     input: str
-    voice: str = "aiome_narrator"
+    voice: str = DEFAULT_VOICE
     response_format: str = "wav"
     # ボイスクローン用の参照テキスト（任意）
     ref_text: str | None = None
@@ -95,32 +352,60 @@ class SpeechRequest(BaseModel):
     speed: float | None = None
 
 
-def resolve_voice_path(voice_name: str) -> str:
+class VoiceEntry(NamedTuple):
+    """スキャン済みボイス: 実パスと、プロンプトキャッシュのキーに使う更新時刻"""
+    path: str
+    mtime_ns: int
+
+
+def scan_voices() -> dict[str, VoiceEntry]:
+    """
+    VOICES_DIR を走査し、有効なボイス名 → (実パス, mtime) の対応表を作る。
+    名前が is_safe_voice_name を満たさないもの、シンボリックリンクで VOICES_DIR 外を指すものは除外。
+    """
+    real_voices_dir = os.path.realpath(VOICES_DIR)
+    voice_map = {}
+    for wav_path in Path(VOICES_DIR).glob("*.wav"):
+        if not is_safe_voice_name(wav_path.stem) or not wav_path.is_file():
+            continue
+        real_path = str(wav_path.resolve())
+        if not real_path.startswith(real_voices_dir):
+            logger.warning(f"Skipping voice outside VOICES_DIR: {wav_path.name}")
+            continue
+        voice_map[wav_path.stem] = VoiceEntry(real_path, wav_path.stat().st_mtime_ns)
+    return voice_map
+
+
+async def voice_map_refresher():
+    """VOICE_MAP_REFRESH_SEC 毎にボイス対応表を再構築する (バックグラウンドタスク)"""
+    while True:
+        await asyncio.sleep(VOICE_MAP_REFRESH_SEC)
+        try:
+            app.state.voice_map = await asyncio.to_thread(scan_voices)
+        except Exception as e:
+            logger.error(f"Voice map refresh failed: {e}")
+
+
+def resolve_voice(voice_name: str) -> VoiceEntry:
     """
-    voice パラメータからWAVファイルパスを安全に解決する。
+    voice パラメータからWAVファイルパス (と mtime) を安全に解決する。
     LFI (パストラバーサル) を物理的に防止。
+    起動時にスキャン済みの対応表を引くだけなので、ファイルシステムには触れない。
     """
-    if not VOICE_NAME_RE.match(voice_name):
+    if not is_safe_voice_name(voice_name):
         raise HTTPException(
             status_code=400,
-            detail=f"Invalid voice name: '{voice_name}'. Only alphanumeric, hyphens, and underscores allowed."
+            detail=f"Invalid voice name: '{voice_name}'. Only alphanumeric, hyphens, and underscores allowed (max {_VOICE_NAME_MAX_LEN} chars)."
         )
 
-    wav_path = os.path.join(VOICES_DIR, f"{voice_name}.wav")
-
-    # 二重チェック: resolved path が VOICES_DIR 内であることを確認
-    real_path = os.path.realpath(wav_path)
-    real_voices_dir = os.path.realpath(VOICES_DIR)
-    if not real_path.startswith(real_voices_dir):
-        raise HTTPException(status_code=400, detail="Path traversal detected.")
-
-    if not os.path.isfile(wav_path):
+    entry = app.state.voice_map.get(voice_name)
+    if entry is None:
         raise HTTPException(
             status_code=404,
-            detail=f"Voice file not found: '{voice_name}'. Place a WAV file at: {wav_path}"
+            detail=f"Voice file not found: '{voice_name}'. Place a WAV file at: {os.path.join(VOICES_DIR, f'{voice_name}.wav')}"
         )
 
-    return wav_path
+    return entry
 
 
 # --- デフォルト TTS 品質パラメータ ---
@@ -139,104 +424,352 @@ DEFAULT_REF_TEXT = os.environ.get(
 )
 
 
-def synthesize(text: str, voice_name: str, ref_text: str | None,
-               temperature: float | None = None,
-               repetition_penalty: float | None = None,
-               speed: float | None = None) -> bytes:
+class SynthParams(NamedTuple):
+    """バッチのグルーピングキー (全フィールドが一致するリクエストのみ同一バッチに載せる)"""
+    voice_name: str
+    ref_audio_path: str
+    ref_audio_mtime_ns: int
+    ref_text: str
+    speed: float
+    temperature: float
+    repetition_penalty: float
+
+
+def resolve_params(voice_name: str, ref_text: str | None,
+                   temperature: float | None = None,
+                   repetition_penalty: float | None = None,
+                   speed: float | None = None) -> SynthParams:
     """
-    同期的なTTS推論 (スレッドプールから呼ばれる)
-    44.1kHz WAV バイナリを返す
+    ボイス名を WAV パスに解決し (不正・未登録なら HTTPException)、
+    リクエストの任意パラメータをデフォルト値で補完する
     """
-    ref_audio_path = resolve_voice_path(voice_name)
+    voice = resolve_voice(voice_name)
+    return SynthParams(
+        voice_name=voice_name,
+        ref_audio_path=voice.path,
+        ref_audio_mtime_ns=voice.mtime_ns,
+        # ref_text 解決: リクエスト > デフォルト > 空
+        ref_text=ref_text if ref_text is not None else DEFAULT_REF_TEXT,
+        speed=speed if speed is not None else DEFAULT_SPEED,
+        temperature=temperature if temperature is not None else DEFAULT_TEMPERATURE,
+        repetition_penalty=repetition_penalty if repetition_penalty is not None else DEFAULT_REPETITION_PENALTY,
+    )
+
+
+def to_output_pcm_cpu(wav: np.ndarray, sr: int) -> np.ndarray:
+    """CPU 上の float32 波形を resample_poly (C 実装のポリフェーズ FIR) で 44.1kHz int16 にする"""
+    pcm_f32 = wav.astype(np.float32, copy=False)
+    if sr != OUTPUT_SAMPLE_RATE:
+        g = math.gcd(int(sr), OUTPUT_SAMPLE_RATE)
+        pcm_f32 = resample_poly(pcm_f32, OUTPUT_SAMPLE_RATE // g, int(sr) // g)
+    return quantize_int16(pcm_f32)
 
-    # パラメータのフォールバック
-    actual_speed = speed if speed is not None else DEFAULT_SPEED
-    actual_temp = temperature if temperature is not None else DEFAULT_TEMPERATURE
-    actual_rep_penalty = repetition_penalty if repetition_penalty is not None else DEFAULT_REPETITION_PENALTY
 
-    # ref_text 解決: リクエスト > デフォルト > 空
-    actual_ref_text = ref_text if ref_text is not None else DEFAULT_REF_TEXT
-    use_xvector_only = actual_ref_text.strip() == ""
+def quantize_int16(pcm_f32: np.ndarray) -> np.ndarray:
+    """
+    float 波形を int16 に量子化する。中間配列を作らず、再利用するスクラッチバッファ上で
+    乗算・クリップを in-place に行い、最後に int16 へ1回だけ変換する。
+    """
+    global _QUANT_SCRATCH
+    n = pcm_f32.size
+    if _QUANT_SCRATCH.size < n:
+        _QUANT_SCRATCH = np.empty(n, dtype=np.float32)
+    buf = _QUANT_SCRATCH[:n]
+    np.multiply(pcm_f32, 32767.0, out=buf)
+    np.clip(buf, -32767.0, 32767.0, out=buf)  # デバイス経路の clamp(-1, 1) * 32767 と同じ対称レンジ
+    return buf.astype(np.int16)
 
-    logger.info(
-        f"Synthesizing: text='{text[:50]}...', voice={voice_name}, "
-        f"xvector_only={use_xvector_only}, speed={actual_speed}, "
-        f"temp={actual_temp}, rep_penalty={actual_rep_penalty}"
+
+def to_output_pcm(wavs: list, sr: int) -> list[np.ndarray]:
+    """
+    モデル出力波形 (デバイス上のテンソル or numpy) を 44.1kHz にリサンプル・int16 量子化し、
+    ホスト側の int16 配列として返す。CUDA ではピン留めバッファへ非同期コピーし、同期は1回のみ。
+    CPU 推論時は torch を経由せず numpy のまま処理する。
+    """
+    if model.device.type == "cpu":
+        # CPU テンソルの np.asarray はゼロコピー
+        return [to_output_pcm_cpu(np.asarray(wav), sr) for wav in wavs]
+
+    resampled = []
+    for wav in wavs:
+        wav_tensor = torch.as_tensor(wav).unsqueeze(0).float()
+        # Resample to 44.1kHz for FFmpeg pipeline compatibility
+        if sr != OUTPUT_SAMPLE_RATE:
+            wav_tensor = resample(wav_tensor, sr)
+        resampled.append((wav_tensor.squeeze(0).clamp_(-1.0, 1.0) * 32767.0).to(torch.int16))
+
+    if resampled and resampled[0].is_cuda:
+        host = [torch.empty(t.shape, dtype=t.dtype, pin_memory=True) for t in resampled]
+        for dst, src in zip(host, resampled):
+            dst.copy_(src, non_blocking=True)
+        torch.cuda.current_stream(resampled[0].device).synchronize()
+    else:
+        host = [t.cpu() for t in resampled]
+    return [t.numpy() for t in host]
+
+
+def wav_header(num_samples: int) -> bytes:
+    """44.1kHz / mono / int16 PCM 用の 44 バイト RIFF ヘッダ"""
+    data_size = num_samples * 2
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", 36 + data_size, b"WAVE",
+        b"fmt ", 16, 1, 1, OUTPUT_SAMPLE_RATE, OUTPUT_SAMPLE_RATE * 2, 2, 16,
+        b"data", data_size,
     )
 
+
+async def stream_wav(pcm: np.ndarray):
+    """
+    WAV ヘッダに続けて PCM を STREAM_CHUNK_BYTES 毎に送出する。
+    チャンクは pcm バッファへの memoryview なのでコピーは発生しない。
+    """
+    yield wav_header(pcm.size)
+    data = memoryview(pcm.astype("<i2", copy=False)).cast("B")
+    for start in range(0, len(data), STREAM_CHUNK_BYTES):
+        yield data[start:start + STREAM_CHUNK_BYTES]
+
+
+# --- /v1/audio/speech のレスポンスヘッダ (モジュールロード時にエンコード済み) ---
+_WAV_RESPONSE_HEADERS = [
+    (b"content-type", b"audio/wav"),
+    (b"content-disposition", b"attachment; filename=speech.wav"),
+    (b"cache-control", b"no-store"),
+]
+
+
+class WavStreamingResponse(StreamingResponse):
+    """
+    WAV ストリーミング用レスポンス。ヘッダは事前エンコード済みのリストを使い回し、
+    リクエスト毎の dict 構築・エンコードを省く。長さは既知なので Content-Length も付ける。
+    """
+    media_type = "audio/wav"
+
+    def __init__(self, pcm: np.ndarray):
+        self.content_length = 44 + pcm.size * 2
+        super().__init__(stream_wav(pcm))
+
+    def init_headers(self, headers=None) -> None:
+        self.raw_headers = [*_WAV_RESPONSE_HEADERS, (b"content-length", str(self.content_length).encode("latin-1"))]
+
+
+@functools.lru_cache(maxsize=64)
+def _build_voice_clone_prompt(ref_audio_path: str, ref_text: str, mtime_ns: int):
+    """
+    リファレンス音声から話者埋め込み (x-vector) と ICL 用 ref_code を1回だけ抽出する。
+    mtime_ns はキャッシュキー専用 (scan_voices で取得済み): WAV が差し替えられたら
+    次回スキャン以降は別エントリとして再計算される。
+    """
+    use_xvector_only = ref_text.strip() == ""
+    logger.info(f"Encoding reference audio: {os.path.basename(ref_audio_path)} (xvector_only={use_xvector_only})")
+    # 話者エンコーダは精度に敏感なため autocast は掛けない
+    with torch.inference_mode():
+        return model.create_voice_clone_prompt(
+            ref_audio=ref_audio_path,
+            ref_text="" if use_xvector_only else ref_text,
+            x_vector_only_mode=use_xvector_only,
+        )
+
+
+def get_voice_clone_prompt(params: SynthParams):
+    """
+    キャッシュ済みの VoiceClonePromptItem リストを返す (モデルのデバイス上に保持)。
+    キャッシュ未登録のまま次回スキャン前に WAV が削除されていた場合は 404 を返す。
+    """
+    try:
+        return _build_voice_clone_prompt(params.ref_audio_path, params.ref_text, params.ref_audio_mtime_ns)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail=f"Voice file not found: '{params.voice_name}'.")
+
+
+def synthesize_batch(texts: list[str], params: SynthParams) -> list[np.ndarray]:
+    """
+    同期的なTTS推論 (専用ワーカースレッド app.state.executor から呼ばれる)
+    同一パラメータの複数テキストを1回の generate_voice_clone で処理し、
+    テキストごとの 44.1kHz int16 PCM を返す
+    """
+    # ログ無効時はスライス等の文字列生成自体を行わない (フォーマットは handler 側で遅延実行)
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(
+            "Synthesizing batch: size=%d, text='%s...', voice=%s, xvector_only=%s, speed=%s, temp=%s, rep_penalty=%s",
+            len(texts), texts[0][:50], params.voice_name, params.ref_text.strip() == "",
+            params.speed, params.temperature, params.repetition_penalty,
+        )
+
     gen_kwargs = {
-        "temperature": actual_temp,
-        "repetition_penalty": actual_rep_penalty,
+        "temperature": params.temperature,
+        "repetition_penalty": params.repetition_penalty,
     }
 
-    if use_xvector_only:
-        wavs, sr = model.generate_voice_clone(
-            text=text,
-            language="Auto",
-            ref_audio=ref_audio_path,
-            ref_text="",
-            x_vector_only_mode=True,
-            speed=actual_speed,
-            **gen_kwargs,
+    with infer_stream():
+        prompt_items = get_voice_clone_prompt(params)
+
+        with _INFER_CTX():
+            wavs, sr = model.generate_voice_clone(
+                text=texts,
+                language="Auto",
+                voice_clone_prompt=prompt_items,
+                speed=params.speed,
+                **gen_kwargs,
+            )
+
+        if sr != OUTPUT_SAMPLE_RATE:
+            logger.info("Resampling: %sHz → %sHz", sr, OUTPUT_SAMPLE_RATE)
+
+        with torch.inference_mode():
+            return to_output_pcm(wavs, sr)
+
+
+class SpeechJob(NamedTuple):
+    """バッチキューに積まれる1リクエスト分のジョブ"""
+    text: str
+    params: SynthParams
+    future: asyncio.Future
+
+
+def fail_jobs(jobs: list[SpeechJob], exc: BaseException):
+    """未完了のジョブに例外をセットする"""
+    for job in jobs:
+        if not job.future.done():
+            job.future.set_exception(exc)
+
+
+async def run_batch(batch: list[SpeechJob], params: SynthParams):
+    """
+    バッチを推論して各ジョブの future に結果をセットする。
+    バッチ全体が失敗した場合は1件ずつ再実行し、失敗原因のジョブ以外を巻き込まないようにする。
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        results = await loop.run_in_executor(
+            app.state.executor, synthesize_batch, [job.text for job in batch], params
         )
+    except Exception as e:
+        if len(batch) == 1:
+            fail_jobs(batch, e)
+            return
+        logger.warning("Batch of %d failed (%s); retrying jobs individually", len(batch), e)
+        for job in batch:
+            if job.future.done():
+                continue
+            try:
+                pcm, = await loop.run_in_executor(app.state.executor, synthesize_batch, [job.text], params)
+            except Exception as job_exc:
+                fail_jobs([job], job_exc)
+            else:
+                if not job.future.done():
+                    job.future.set_result(pcm)
     else:
-        wavs, sr = model.generate_voice_clone(
-            text=text,
-            language="Auto",
-            ref_audio=ref_audio_path,
-            ref_text=actual_ref_text,
-            x_vector_only_mode=False,
-            speed=actual_speed,
-            **gen_kwargs,
-        )
+        for job, pcm in zip(batch, results):
+            if not job.future.done():
+                job.future.set_result(pcm)
 
-    # numpy array → torch tensor for resampling
-    wav_tensor = torch.from_numpy(wavs[0]).unsqueeze(0).float()
 
-    # Resample to 44.1kHz for FFmpeg pipeline compatibility
-    if sr != OUTPUT_SAMPLE_RATE:
-        wav_tensor = torchaudio.functional.resample(wav_tensor, sr, OUTPUT_SAMPLE_RATE)
-        logger.info(f"Resampled: {sr}Hz → {OUTPUT_SAMPLE_RATE}Hz")
+async def server_loop(queue: asyncio.Queue):
+    """
+    バッチワーカー (単一タスク)。
+    先頭ジョブを取り出した後、BATCH_TIMEOUT_SEC が経過するか MAX_BATCH_SIZE に達するまで
+    同一パラメータのジョブを集め、まとめて run_batch に渡す。
+    パラメータが異なるジョブが来た時点でバッチを締め、そのジョブは次バッチの先頭に回す。
+    ループ自体が異常終了する場合は、保持中のジョブを失敗させてから例外を送出する
+    (再起動は on_batch_task_done が行う)。
+    """
+    loop = asyncio.get_running_loop()
+    carry: SpeechJob | None = None
+    batch: list[SpeechJob] = []
 
-    # WAV binary encoding
-    buf = io.BytesIO()
-    sf.write(buf, wav_tensor.squeeze(0).numpy(), OUTPUT_SAMPLE_RATE, format="WAV", subtype="PCM_16")
-    buf.seek(0)
-    return buf.read()
+    try:
+        while True:
+            first = carry if carry is not None else await queue.get()
+            carry = None
+            batch = [first]
+            deadline = loop.time() + BATCH_TIMEOUT_SEC
+
+            while len(batch) < MAX_BATCH_SIZE:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    job = await asyncio.wait_for(queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+                if job.params != first.params:
+                    carry = job
+                    break
+                batch.append(job)
+
+            # クライアント切断等でキャンセル済みのジョブは推論しない
+            batch = [job for job in batch if not job.future.done()]
+            if batch:
+                await run_batch(batch, first.params)
+            batch = []
+    except Exception as e:
+        fail_jobs(batch + ([carry] if carry is not None else []), e)
+        raise
+
+
+def start_batch_worker():
+    """バッチワーカーを起動し、異常終了を監視する"""
+    app.state.batch_task = asyncio.create_task(server_loop(app.state.queue))
+    app.state.batch_task.add_done_callback(on_batch_task_done)
+
+
+def on_batch_task_done(task: asyncio.Task):
+    """バッチワーカーが異常終了したらログを残して再起動する (キュー内のジョブは新しいワーカーが処理する)"""
+    if task.cancelled() or task.exception() is None:
+        return
+    logger.error("Batch worker crashed; restarting", exc_info=task.exception())
+    start_batch_worker()
+
+
+@app.exception_handler(StarletteHTTPException)
+async def http_exception_handler(request: Request, exc: StarletteHTTPException):
+    """4xx/5xx の JSON ボディも orjson でシリアライズする"""
+    return ORJSONResponse({"detail": exc.detail}, status_code=exc.status_code, headers=exc.headers)
+
+
+@app.exception_handler(RequestValidationError)
+async def validation_exception_handler(request: Request, exc: RequestValidationError):
+    """バリデーションエラー (422) も orjson でシリアライズする"""
+    return ORJSONResponse({"detail": jsonable_encoder(exc.errors())}, status_code=422)
 
 
 @app.on_event("startup")
 async def startup():
-    """サーバー起動時にモデルをプリロード"""
-    await asyncio.to_thread(load_model)
+    """サーバー起動時にボイス対応表を構築し、モデルをプリロード"""
+    app.state.voice_map = await asyncio.to_thread(scan_voices)
+    logger.info(f"Voices available: {sorted(app.state.voice_map)}")
+    # GPU を触る処理はすべてこのスレッドに集約する (CUDA ストリーム / Graph プールの前提)
+    app.state.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tts-worker")
+    await asyncio.get_running_loop().run_in_executor(app.state.executor, load_model)
+    app.state.queue = asyncio.Queue()
+    start_batch_worker()
+    app.state.voice_refresh_task = asyncio.create_task(voice_map_refresher())
     logger.info(f"Server ready on port {PORT}")
 
 
 @app.post("/v1/audio/speech")
 async def create_speech(req: SpeechRequest):
     """OpenAI API 互換エンドポイント"""
-    if not req.input or not req.input.strip():
+    if not req.input:  # str_strip_whitespace により空白のみの入力も空文字になる
         raise HTTPException(status_code=400, detail="Input text is empty.")
 
     if len(req.input) > 1500:
         raise HTTPException(status_code=400, detail="Input text too long (max 1500 chars). Split on Rust side.")
 
+    params = resolve_params(req.voice, req.ref_text, req.temperature, req.repetition_penalty, req.speed)
+    future = asyncio.get_running_loop().create_future()
+    await app.state.queue.put(SpeechJob(req.input, params, future))
+
     try:
-        wav_bytes = await asyncio.to_thread(
-            synthesize, req.input, req.voice, req.ref_text,
-            req.temperature, req.repetition_penalty, req.speed
-        )
+        pcm = await future
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Synthesis failed: {e}", exc_info=True)
+        logger.error("Synthesis failed: %s", e, exc_info=True)
         raise HTTPException(status_code=500, detail=f"Synthesis failed: {str(e)}")
 
-    return Response(
-        content=wav_bytes,
-        media_type="audio/wav",
-        headers={"Content-Disposition": "attachment; filename=speech.wav"},
-    )
+    return WavStreamingResponse(pcm)
 
 
 @app.get("/health")
@@ -253,4 +786,9 @@ if __name__ == "__main__":
         port=PORT,
         log_level="info",
         workers=1,  # モデルはプロセス内シングルトン
+        loop="uvloop",     # C 実装のイベントループ
+        http="httptools",  # C 実装の HTTP パーサ (h11 にフォールバックさせない)
+        timeout_keep_alive=30,
+        limit_concurrency=256,
+        backlog=2048,
     )